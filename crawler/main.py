@@ -3,6 +3,7 @@ import re
 from bs4 import BeautifulSoup
 from urllib.parse import urlparse, urljoin
 import urllib.request
+import urllib.error
 import urllib.robotparser
 import urllib3
 import xmltodict
@@ -10,8 +11,10 @@ import sqlite3
 from datetime import datetime
 import time
 
+from indexation_web_metrics import Metrics
+
 class Crawler:
-    def __init__(self, start_url: str, max_urls: int = 50, politeness_delay: int = 3, nb_links: int = 5, nb_sitemaps: int = 5):
+    def __init__(self, start_url: str, max_urls: int = 50, politeness_delay: int = 3, nb_links: int = 5, nb_sitemaps: int = 5, metrics: Metrics = None):
         """
         Initialise l'objet Crawler avec les paramètres spécifiés.
 
@@ -21,6 +24,7 @@ class Crawler:
         - politeness_delay (int): Délai en secondes entre les requêtes pour respecter les politiques du site.
         - nb_links (int): Nombre de liens à extraire par page.
         - nb_sitemaps (int): Nombre de sitemaps à extraire par fichier robots.txt.
+        - metrics (Metrics): Instrumentation des étapes du crawl (fetch, robots, parse, store), désactivée si None.
         """
         self.start_url = start_url
         self.max_urls = max_urls
@@ -29,6 +33,7 @@ class Crawler:
         self.frontier = [start_url]
         self.nb_links = nb_links
         self.sitemaps = nb_sitemaps
+        self.metrics = metrics if metrics is not None else Metrics()
 
     def write_finded_urls(self, url: str) -> None:
         """
@@ -81,10 +86,11 @@ class Crawler:
         """
         Fonction principale pour démarrer le crawling à partir de l'URL de départ.
         """
-        while self.frontier and len(self.visited_urls) < self.max_urls:
-            url = self.frontier.pop(0)
-            self.recursive_crawl(url)
-            time.sleep(self.politeness_delay)
+        with self.metrics.profiling():
+            while self.frontier and len(self.visited_urls) < self.max_urls:
+                url = self.frontier.pop(0)
+                self.recursive_crawl(url)
+                time.sleep(self.politeness_delay)
 
     def recursive_crawl(self, url: str) -> None:
         """
@@ -96,12 +102,16 @@ class Crawler:
         if url in self.visited_urls:
             return
         else:
-            self.write_finded_urls(url)
+            with self.metrics.timer('store'):
+                self.write_finded_urls(url)
             # Marquer l'URL comme visitée
-            response = requests.get(url)
-            html = response.text
-            self.update_bdd(url, html)
+            with self.metrics.timer('fetch'):
+                response = requests.get(url)
+                html = response.text
+            with self.metrics.timer('store'):
+                self.update_bdd(url, html)
             self.visited_urls.append(url)
+            self.metrics.increment('pages_crawled')
 
             try:
                 # Vérifier le fichier robots.txt avant de crawler
@@ -111,11 +121,15 @@ class Crawler:
                     links = self.extract_links(url)
                     for sitemap_url in sitemap_urls:
                         links += self.parse_sitemap(sitemap_url)
+                    self.metrics.increment('links_found', len(links))
                     for link in links:
                         if link not in self.visited_urls and link not in self.frontier:
                             self.frontier.append(link)
+                else:
+                    self.metrics.increment('disallowed_by_robots')
 
             except Exception as e:
+                self.metrics.increment('errors')
                 print(f"Erreur lors du traitement de {url}: {e}")
 
     def extract_links(self, url: str) -> list:
@@ -135,14 +149,16 @@ class Crawler:
         # return links
         links = []
         try:
-            response = urllib.request.urlopen(url)
-            html = response.read()
-            parsed_html = BeautifulSoup(html, 'html.parser')
-            anchor_tags = parsed_html.find_all('a')
-            for tag in anchor_tags:
-                href = tag.get('href')
-                if href and href.startswith("http"):
-                    links.append(href)
+            with self.metrics.timer('fetch'):
+                response = urllib.request.urlopen(url)
+                html = response.read()
+            with self.metrics.timer('parse'):
+                parsed_html = BeautifulSoup(html, 'html.parser')
+                anchor_tags = parsed_html.find_all('a')
+                for tag in anchor_tags:
+                    href = tag.get('href')
+                    if href and href.startswith("http"):
+                        links.append(href)
         except:
             links = []
 
@@ -163,7 +179,18 @@ class Crawler:
 
         rp = urllib.robotparser.RobotFileParser(robots_url)
         rp.set_url(robots_url)
-        rp.read()
+        # Équivalent de rp.read(), en séparant le téléchargement (fetch) de l'analyse du fichier (robots)
+        try:
+            with self.metrics.timer('fetch'):
+                robots_txt = urllib.request.urlopen(robots_url).read()
+        except urllib.error.HTTPError as err:
+            if err.code in (401, 403):
+                rp.disallow_all = True
+            elif 400 <= err.code < 500:
+                rp.allow_all = True
+        else:
+            with self.metrics.timer('robots'):
+                rp.parse(robots_txt.decode("utf-8").splitlines())
         return rp.can_fetch("*", url) #on regarde si l'url fait partie des url autorisée par le robot
 
     def get_sitemaps_url(self, url: str) -> list:
@@ -179,9 +206,11 @@ class Crawler:
         parsed_url = urlparse(url)
         robots_url = f"{parsed_url.scheme}://{parsed_url.netloc}/robots.txt" #url du document robot.txt
         try:
-            response = requests.get(robots_url)
-            response.raise_for_status()
-            sitemap_links = re.findall(r'Sitemap:\s*(.*?)(?:\r?\n|$)', response.text, re.IGNORECASE) #on récupère les url des sitemaps
+            with self.metrics.timer('fetch'):
+                response = requests.get(robots_url)
+                response.raise_for_status()
+            with self.metrics.timer('parse'):
+                sitemap_links = re.findall(r'Sitemap:\s*(.*?)(?:\r?\n|$)', response.text, re.IGNORECASE) #on récupère les url des sitemaps
             return sitemap_links[:self.nb_sitemaps]
         except Exception as e:
             return []
@@ -197,10 +226,12 @@ class Crawler:
         - list: Liste des liens extraits du sitemap.
         """
         try:
-            https = urllib3.PoolManager()
-            response = https.request('GET', url)
-            sitemap = xmltodict.parse(response.data)
-            links = [link['loc'] for link in sitemap['urlset']['url']]
+            with self.metrics.timer('fetch'):
+                https = urllib3.PoolManager()
+                response = https.request('GET', url)
+            with self.metrics.timer('parse'):
+                sitemap = xmltodict.parse(response.data)
+                links = [link['loc'] for link in sitemap['urlset']['url']]
             return links[:self.nb_links]
         except Exception as e:
             return [] 
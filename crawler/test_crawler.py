@@ -0,0 +1,94 @@
+import importlib.util
+import os
+import urllib.error
+
+import pytest
+
+for module_name in ["requests", "bs4", "urllib3", "xmltodict"]:
+    pytest.importorskip(module_name)
+
+from indexation_web_metrics import Metrics
+
+PAGE = b'<html><a href="https://example.com/a">a</a><a href="https://example.com/b">b</a><a href="/relatif">c</a></html>'
+ROBOTS_TXT = b'User-agent: *\nAllow: /\n'
+
+
+def load_crawler_module():
+    """
+    Charge le module du TP Crawler (nommé main.py comme ceux des autres TP).
+    """
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+    spec = importlib.util.spec_from_file_location('crawler_main', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+        self.text = content.decode('utf-8')
+
+    def read(self):
+        return self.content
+
+    def raise_for_status(self):
+        pass
+
+
+@pytest.fixture
+def crawler_main(tmp_path, monkeypatch):
+    """
+    Module du crawler dont les accès réseau sont simulés ; les fichiers sont écrits dans un dossier temporaire.
+    """
+    monkeypatch.chdir(tmp_path)
+    module = load_crawler_module()
+
+    def fake_get(url):
+        return FakeResponse(ROBOTS_TXT if url.endswith('/robots.txt') else PAGE)
+
+    monkeypatch.setattr(module.requests, 'get', fake_get)
+    monkeypatch.setattr(module.urllib.request, 'urlopen', fake_get)
+    return module
+
+
+def test_crawl_records_stages_and_counters(crawler_main):
+    metrics = Metrics(enabled=True)
+    crawler = crawler_main.Crawler('https://example.com/', max_urls=1, politeness_delay=0, metrics=metrics)
+    crawler.create_database_and_table()
+    crawler.crawl()
+
+    assert metrics.counters == {'pages_crawled': 1, 'links_found': 2}
+    # Page, robots.txt (vérification des règles puis recherche des sitemaps) et page pour l'extraction des liens
+    assert metrics.timer_calls['fetch'] == 4
+    assert metrics.timer_calls['robots'] == 1
+    # Extraction des liens et recherche des sitemaps dans robots.txt
+    assert metrics.timer_calls['parse'] == 2
+    assert metrics.timer_calls['store'] == 2
+    assert crawler.frontier == ['https://example.com/a', 'https://example.com/b']
+
+
+def test_crawl_counts_errors(crawler_main, monkeypatch):
+    def failing_urlopen(url):
+        raise urllib.error.URLError('connexion refusée')
+
+    monkeypatch.setattr(crawler_main.urllib.request, 'urlopen', failing_urlopen)
+    metrics = Metrics(enabled=True)
+    crawler = crawler_main.Crawler('https://example.com/', max_urls=1, politeness_delay=0, metrics=metrics)
+    crawler.create_database_and_table()
+    crawler.crawl()
+
+    assert metrics.counters == {'pages_crawled': 1, 'errors': 1}
+
+
+def test_robots_forbidden_disallows_crawl(crawler_main, monkeypatch):
+    def forbidden_urlopen(url):
+        raise urllib.error.HTTPError(url, 403, 'Forbidden', None, None)
+
+    monkeypatch.setattr(crawler_main.urllib.request, 'urlopen', forbidden_urlopen)
+    metrics = Metrics(enabled=True)
+    crawler = crawler_main.Crawler('https://example.com/', max_urls=1, politeness_delay=0, metrics=metrics)
+    crawler.create_database_and_table()
+    crawler.crawl()
+
+    assert metrics.counters == {'pages_crawled': 1, 'disallowed_by_robots': 1}
@@ -1,19 +1,24 @@
 import json
+import os
 from collections import defaultdict
 import spacy
 from nltk.stem import SnowballStemmer
 
+from indexation_web_metrics import Metrics
+
 class IndexWeb:
-    def __init__(self, crawler_urls = 'crawled_urls_light.json'):
+    def __init__(self, crawler_urls = 'crawled_urls_light.json', metrics : Metrics = None):
         """
         Initialise l'objet Index avec les paramètres spécifiés.
 
         Paramètres :
         - crawler_urls (str): Le chemin vers le fichier JSON contenant les URLs du crawler.
+        - metrics (Metrics): Instrumentation des étapes de l'indexation (tokenize, stem, index_build, serialize), désactivée si None.
         """
         self.crawler_urls = crawler_urls
-        self.documents_tokenized = self.tokenize_document()[0]
-        self.documents_tokenized_stem = self.tokenize_document()[1]
+        self.metrics = metrics if metrics is not None else Metrics()
+        with self.metrics.profiling():
+            self.documents_tokenized, self.documents_tokenized_stem = self.tokenize_document()
 
     def load_json(self):
         """
@@ -53,31 +58,23 @@ class IndexWeb:
             pipe_content = process.pipe([content], disable=["tagger"])
             pipe_h1 = process.pipe([h1], disable=["tagger"])
 
-            title_tokens = []
-            content_tokens = []
-            h1_tokens = []
-
-            title_tokens_stem = []
-            content_tokens_stem = []
-            h1_tokens_stem = []
+            # Le pipeline spaCy est paresseux : la tokenisation a lieu lors du parcours des pipes
+            with self.metrics.timer('tokenize'):
+                title_spacy_tokens = [token for doc in pipe_title for token in doc]
+                content_spacy_tokens = [token for doc in pipe_content for token in doc]
+                h1_spacy_tokens = [token for doc in pipe_h1 for token in doc]
 
-            for doc in pipe_title:
-                # Extraire les tokens du titre
-                for token in doc:
-                    title_tokens_stem.append((stemmer.stem(token.lemma_).lower()))
-                    title_tokens.append((token.text.lower()))
+                title_tokens = [token.text.lower() for token in title_spacy_tokens]
+                content_tokens = [token.text.lower() for token in content_spacy_tokens]
+                h1_tokens = [token.text.lower() for token in h1_spacy_tokens]
 
-            for doc in pipe_content:
-                # Extraire les tokens du contenu
-                for token in doc:
-                    content_tokens_stem.append((stemmer.stem(token.lemma_).lower()))
-                    content_tokens.append((token.text.lower()))
+            with self.metrics.timer('stem'):
+                title_tokens_stem = [stemmer.stem(token.lemma_).lower() for token in title_spacy_tokens]
+                content_tokens_stem = [stemmer.stem(token.lemma_).lower() for token in content_spacy_tokens]
+                h1_tokens_stem = [stemmer.stem(token.lemma_).lower() for token in h1_spacy_tokens]
 
-            for doc in pipe_h1:
-                # Extraire les tokens du contenu
-                for token in doc:
-                    h1_tokens_stem.append((stemmer.stem(token.lemma_).lower()))
-                    h1_tokens.append((token.text.lower()))
+            self.metrics.increment('documents_tokenized')
+            self.metrics.increment('tokens', len(title_tokens) + len(content_tokens) + len(h1_tokens))
 
             documents_tokenized.append([title_tokens, content_tokens, h1_tokens])
             documents_tokenized_stem.append([title_tokens_stem, content_tokens_stem, h1_tokens_stem])
@@ -148,20 +145,22 @@ class IndexWeb:
         else : 
             documents = self.documents_tokenized
 
-        for id, document in enumerate(documents) : 
-            tokens = document[nb]
-            for token in set(tokens):  # Using set to avoid duplicate tokens in the same document
-                index[token].append(id)
+        with self.metrics.timer('index_build'):
+            for id, document in enumerate(documents) : 
+                tokens = document[nb]
+                for token in set(tokens):  # Using set to avoid duplicate tokens in the same document
+                    index[token].append(id)
 
         return dict(index)
     
-    def build_positional_index(self, field : str, stemming : bool = False):
+    def build_positional_index(self, field : str, stemming : bool = False, doc_ids : list = None):
         """
         Construit un index positionnel pour le champ spécifié.
 
         Paramètres :
         - field (str): Le champ pour lequel construire l'index ('title', 'content' ou 'h1').
         - stemming (bool): Indique si le stemming doit être appliqué lors de la construction de l'index.
+        - doc_ids (list): Identifiants des documents à indexer (tous les documents si None).
 
         Sortie :
         - defaultdict: Index positionnel construit pour le champ spécifié.
@@ -184,20 +183,111 @@ class IndexWeb:
         else : 
             documents = self.documents_tokenized
 
-        # Parcourir tous les documents
-        for id, document in enumerate(documents):
-            
+        if doc_ids is None : 
+            doc_ids = range(len(documents))
+
+        with self.metrics.timer('index_build'):
+            # Parcourir tous les documents
+            for id in doc_ids:
+                document = documents[id]
 
-            # Parcourir chaque token
-            tokens = document[nb]
-            for position, token in enumerate(tokens):
-                # Ajouter la position du terme dans l'index positionnel
-                positional_index[token][id].append(position)
+                # Parcourir chaque token
+                tokens = document[nb]
+                for position, token in enumerate(tokens):
+                    # Ajouter la position du terme dans l'index positionnel
+                    positional_index[token][id].append(position)
 
         return positional_index
 
+    def partition_documents(self, nb_shards : int):
+        """
+        Répartit les documents entre plusieurs shards (le document d'identifiant id va dans le shard id % nb_shards).
+
+        Paramètres :
+        - nb_shards (int): Nombre de shards.
+
+        Sortie :
+        - list: Liste des identifiants de documents de chaque shard.
+        """
+        return [list(range(shard, len(self.documents_tokenized), nb_shards)) for shard in range(nb_shards)]
+
+    def build_shards(self, nb_shards : int, stemming : bool = False):
+        """
+        Construit un index positionnel partitionné en shards. Chaque shard possède ses propres index (titre, contenu, h1),
+        ses documents et les statistiques de collection utilisées par le TP Requête (voir calculate_shard_statistics).
+        Les identifiants de documents restent globaux.
+
+        Paramètres :
+        - nb_shards (int): Nombre de shards.
+        - stemming (bool): Indique si le stemming doit être appliqué lors de la construction des index.
+
+        Sortie :
+        - list: Liste de dictionnaires, un par shard, contenant 'documents', 'statistics', 'title', 'content' et 'h1'.
+        """
+        urls = self.load_json()
+        shards = []
+        for doc_ids in self.partition_documents(nb_shards) : 
+            shard = {
+                'documents': [{'id': id, 'url': urls[id]['url'], 'title': urls[id]['title'], 'content': urls[id]['content']} for id in doc_ids]
+            }
+            for field in ['title', 'content', 'h1'] : 
+                shard[field] = self.build_positional_index(field, stemming=stemming, doc_ids=doc_ids)
+            shard['statistics'] = self.calculate_shard_statistics(shard['documents'], shard['title'], shard['content'])
+            shards.append(shard)
+        return shards
+
+    def calculate_shard_statistics(self, documents : list, index_title : dict, index_content : dict):
+        """
+        Calcule les statistiques de collection d'un shard, fusionnées par le TP Requête pour que les scores
+        soient identiques à ceux d'un index non partitionné.
+
+        Paramètres :
+        - documents (list): Documents du shard.
+        - index_title (dict): Index positionnel des titres du shard.
+        - index_content (dict): Index positionnel des contenus du shard.
+
+        Sortie :
+        - dict: Nombre de documents, longueur totale des contenus (en caractères) et fréquence documentaire de chaque terme (contenu et titre).
+        """
+        return {
+            'num_documents': len(documents),
+            'total_doc_length': sum(len(document['content']) for document in documents),
+            'document_frequencies': {term: len(postings) for term, postings in index_content.items()},
+            'title_document_frequencies': {term: len(postings) for term, postings in index_title.items()}
+        }
+
+    def save_shards(self, shards : list, shards_dir : str = './sharded_index'):
+        """
+        Écrit les shards dans un dossier, avec un sous-dossier shard_i par shard contenant metadata.json, documents.json
+        et les index title.pos_index.json, content.pos_index.json et h1.pos_index.json.
+
+        Paramètres :
+        - shards (list): Shards construits par build_shards.
+        - shards_dir (str): Chemin du dossier de sortie.
+        """
+        for nb, shard in enumerate(shards):
+            shard_dir = os.path.join(shards_dir, f'shard_{nb}')
+            os.makedirs(shard_dir, exist_ok=True)
+            self.save_json(shard['statistics'], os.path.join(shard_dir, 'metadata.json'))
+            self.save_json(shard['documents'], os.path.join(shard_dir, 'documents.json'))
+            for field in ['title', 'content', 'h1']:
+                self.save_json(shard[field], os.path.join(shard_dir, f'{field}.pos_index.json'))
+
+    def save_json(self, data, path : str):
+        """
+        Écrit des données (index, statistiques, ...) dans un fichier JSON.
+
+        Paramètres :
+        - data: Données à écrire.
+        - path (str): Chemin du fichier JSON.
+        """
+        with self.metrics.timer('serialize'):
+            with open(path, 'w') as file:
+                json.dump(data, file, indent=2)
+
 
 if __name__ == "__main__":
+    NB_SHARDS = 4
     indexcalculator = IndexWeb()
 
     statistics = indexcalculator.calculate_statistics()
@@ -216,43 +306,22 @@ if __name__ == "__main__":
     pos_index_content_stem = indexcalculator.build_positional_index('content', stemming=True)
     pos_index_h1_stem = indexcalculator.build_positional_index('h1', stemming=True)
 
-    with open('metadata.json', 'w') as metadata_file:
-        json.dump(statistics, metadata_file, indent=2)
-
-
-    with open('./non_positional_index/title.non_pos_index.json', 'w') as index_file_title:
-        json.dump(index_title, index_file_title, indent=2)
-
-    with open('./non_positional_index/content.non_pos_index.json', 'w') as index_file_content:
-        json.dump(index_content, index_file_content, indent=2)
-
-    with open('./non_positional_index/h1.non_pos_index.json', 'w') as index_file_h1:
-        json.dump(index_h1, index_file_h1, indent=2)
-
-    with open('./non_positional_index/mon_stemmer.title.non_pos_index.json', 'w') as index_stem_file_title:
-        json.dump(index_title_stem, index_stem_file_title, indent=2)
+    shards = indexcalculator.build_shards(NB_SHARDS)
 
-    with open('./non_positional_index/mon_stemmer.content.non_pos_index.json', 'w') as index_stem_file_content:
-        json.dump(index_content_stem, index_stem_file_content, indent=2)
+    indexcalculator.save_json(statistics, 'metadata.json')
 
-    with open('./non_positional_index/mon_stemmer.h1.non_pos_index.json', 'w') as index_stem_file_h1:
-        json.dump(index_h1_stem, index_stem_file_h1, indent=2)
-
-
-    with open('./positional_index/content.pos_index.json', 'w') as pos_index_file_content:
-        json.dump(pos_index_content, pos_index_file_content, indent=2)
-
-    with open('./positional_index/title.pos_index.json', 'w') as pos_index_file_title:
-        json.dump(pos_index_title, pos_index_file_title, indent=2)
-    
-    with open('./positional_index/h1.pos_index.json', 'w') as pos_index_file_h1:
-        json.dump(pos_index_h1, pos_index_file_h1, indent=2)
-    
-    with open('./positional_index/mon_stemmer.title.pos_index.json', 'w') as pos_index_stem_file_title:
-        json.dump(pos_index_title_stem, pos_index_stem_file_title, indent=2)
+    indexcalculator.save_json(index_title, './non_positional_index/title.non_pos_index.json')
+    indexcalculator.save_json(index_content, './non_positional_index/content.non_pos_index.json')
+    indexcalculator.save_json(index_h1, './non_positional_index/h1.non_pos_index.json')
+    indexcalculator.save_json(index_title_stem, './non_positional_index/mon_stemmer.title.non_pos_index.json')
+    indexcalculator.save_json(index_content_stem, './non_positional_index/mon_stemmer.content.non_pos_index.json')
+    indexcalculator.save_json(index_h1_stem, './non_positional_index/mon_stemmer.h1.non_pos_index.json')
 
-    with open('./positional_index/mon_stemmer.content.pos_index.json', 'w') as pos_index_stem_file_content:
-        json.dump(pos_index_content_stem, pos_index_stem_file_content, indent=2)
+    indexcalculator.save_json(pos_index_content, './positional_index/content.pos_index.json')
+    indexcalculator.save_json(pos_index_title, './positional_index/title.pos_index.json')
+    indexcalculator.save_json(pos_index_h1, './positional_index/h1.pos_index.json')
+    indexcalculator.save_json(pos_index_title_stem, './positional_index/mon_stemmer.title.pos_index.json')
+    indexcalculator.save_json(pos_index_content_stem, './positional_index/mon_stemmer.content.pos_index.json')
+    indexcalculator.save_json(pos_index_h1_stem, './positional_index/mon_stemmer.h1.pos_index.json')
 
-    with open('./positional_index/mon_stemmer.h1.pos_index.json', 'w') as pos_index_stem_file_h1:
-        json.dump(pos_index_h1_stem, pos_index_stem_file_h1, indent=2)
\ No newline at end of file
+    indexcalculator.save_shards(shards)
@@ -0,0 +1,65 @@
+import importlib.util
+import json
+import os
+
+import pytest
+
+pytest.importorskip("spacy")
+pytest.importorskip("nltk")
+
+from indexation_web_metrics import Metrics
+
+CRAWLED_URLS = [{'url': 'https://example.com/0', 'title': 'Erreur 404', 'content': 'Page introuvable', 'h1': 'Erreur'},
+                {'url': 'https://example.com/1', 'title': 'Accueil', 'content': 'Bienvenue sur le site', 'h1': 'Bienvenue'}]
+
+
+def load_index_module():
+    """
+    Charge le module du TP Index (nommé main.py comme ceux des autres TP).
+    """
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+    spec = importlib.util.spec_from_file_location('index_main', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class FakeToken:
+    def __init__(self, text):
+        self.text = text
+        self.lemma_ = text
+
+
+class FakeLanguage:
+    """
+    Pipeline spaCy simulé : découpe les textes sur les espaces.
+    """
+    def pipe(self, texts, disable=None):
+        for text in texts:
+            yield [FakeToken(word) for word in text.split()]
+
+
+@pytest.fixture
+def index_web_class(tmp_path, monkeypatch):
+    module = load_index_module()
+    monkeypatch.setattr(module.spacy, 'load', lambda name: FakeLanguage())
+    with open(tmp_path / 'crawled_urls.json', 'w') as file:
+        json.dump(CRAWLED_URLS, file)
+    return module.IndexWeb
+
+
+def test_indexing_records_stages_and_counters(index_web_class, tmp_path):
+    metrics = Metrics(enabled=True)
+    index_web = index_web_class(str(tmp_path / 'crawled_urls.json'), metrics=metrics)
+
+    assert index_web.documents_tokenized[0] == [['erreur', '404'], ['page', 'introuvable'], ['erreur']]
+    assert metrics.counters == {'documents_tokenized': 2, 'tokens': 11}
+    assert metrics.timer_calls['tokenize'] == 2
+    assert metrics.timer_calls['stem'] == 2
+
+    index = index_web.build_positional_index('content')
+    index_web.build_non_positional_index('title')
+    index_web.save_json(index, str(tmp_path / 'content.pos_index.json'))
+
+    assert metrics.timer_calls['index_build'] == 2
+    assert metrics.timer_calls['serialize'] == 1
@@ -0,0 +1,160 @@
+import cProfile
+import io
+import json
+import pstats
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+# Contexte vide partagé, retourné par timer() quand l'instrumentation est désactivée
+_NULL_TIMER = nullcontext()
+
+class Metrics:
+    def __init__(self, enabled: bool = False, profile: bool = False, prefix: str = 'indexation_web'):
+        """
+        Initialise l'objet Metrics qui collecte les durées et compteurs de chaque étape.
+        Lorsque l'instrumentation est désactivée, timer() et increment() ne font rien.
+
+        Paramètres :
+        - enabled (bool): Indique si les durées et compteurs doivent être collectés.
+        - profile (bool): Indique si les exécutions encadrées par profiling() doivent être profilées avec cProfile.
+        - prefix (str): Préfixe des noms de métriques au format Prometheus.
+        """
+        self.enabled = enabled
+        self.prefix = prefix
+        self.timers = defaultdict(float)
+        self.timer_calls = defaultdict(int)
+        self.counters = defaultdict(int)
+        self.profiler = cProfile.Profile() if profile else None
+
+    def timer(self, stage: str):
+        """
+        Retourne un gestionnaire de contexte qui mesure la durée du bloc et l'ajoute à l'étape spécifiée.
+
+        Paramètres :
+        - stage (str): Nom de l'étape (par exemple 'fetch', 'tokenize', 'score').
+
+        Sortie :
+        - Gestionnaire de contexte.
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return self._timer(stage)
+
+    @contextmanager
+    def _timer(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timers[stage] += time.perf_counter() - start
+            self.timer_calls[stage] += 1
+
+    def increment(self, counter: str, value: int = 1) -> None:
+        """
+        Incrémente un compteur.
+
+        Paramètres :
+        - counter (str): Nom du compteur.
+        - value (int): Valeur à ajouter.
+        """
+        if self.enabled:
+            self.counters[counter] += value
+
+    def merge(self, metrics_dict: dict) -> None:
+        """
+        Ajoute aux métriques courantes des métriques exportées par to_dict (par exemple celles d'un processus worker).
+
+        Paramètres :
+        - metrics_dict (dict): Métriques au format de to_dict.
+        """
+        if not self.enabled:
+            return
+        for stage, timer in metrics_dict['timers'].items():
+            self.timers[stage] += timer['seconds']
+            self.timer_calls[stage] += timer['calls']
+        for counter, value in metrics_dict['counters'].items():
+            self.counters[counter] += value
+
+    @contextmanager
+    def profiling(self):
+        """
+        Profile le bloc avec cProfile si le profilage est activé. Les profils de plusieurs exécutions sont cumulés.
+        """
+        if self.profiler is None:
+            yield
+            return
+        self.profiler.enable()
+        try:
+            yield
+        finally:
+            self.profiler.disable()
+
+    def profile_stats(self, sort_by: str = 'cumulative', nb_lines: int = 30) -> str:
+        """
+        Retourne le résumé texte du profil cumulé.
+
+        Paramètres :
+        - sort_by (str): Critère de tri des fonctions (voir pstats).
+        - nb_lines (int): Nombre de fonctions affichées.
+
+        Sortie :
+        - str: Résumé du profil (vide si le profilage est désactivé).
+        """
+        if self.profiler is None:
+            return ''
+        stream = io.StringIO()
+        pstats.Stats(self.profiler, stream=stream).sort_stats(sort_by).print_stats(nb_lines)
+        return stream.getvalue()
+
+    def dump_profile(self, path: str) -> None:
+        """
+        Écrit le profil cumulé au format pstats (lisible avec snakeviz, pstats, ...).
+
+        Paramètres :
+        - path (str): Chemin du fichier de sortie.
+        """
+        if self.profiler is not None:
+            self.profiler.dump_stats(path)
+
+    def to_dict(self) -> dict:
+        """
+        Retourne les métriques collectées.
+
+        Sortie :
+        - dict: Durée totale et nombre d'appels de chaque étape, et valeur de chaque compteur.
+        """
+        return {
+            'timers': {stage: {'seconds': self.timers[stage], 'calls': self.timer_calls[stage]} for stage in self.timers},
+            'counters': dict(self.counters)
+        }
+
+    def to_prometheus(self) -> str:
+        """
+        Retourne les métriques collectées au format texte Prometheus.
+
+        Sortie :
+        - str: Métriques au format texte Prometheus.
+        """
+        lines = [f'# TYPE {self.prefix}_stage_seconds_total counter']
+        lines += [f'{self.prefix}_stage_seconds_total{{stage="{stage}"}} {seconds}' for stage, seconds in self.timers.items()]
+        lines.append(f'# TYPE {self.prefix}_stage_calls_total counter')
+        lines += [f'{self.prefix}_stage_calls_total{{stage="{stage}"}} {calls}' for stage, calls in self.timer_calls.items()]
+        for counter, value in self.counters.items():
+            lines.append(f'# TYPE {self.prefix}_{counter}_total counter')
+            lines.append(f'{self.prefix}_{counter}_total {value}')
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path: str) -> None:
+        """
+        Écrit les métriques collectées dans un fichier, au format texte Prometheus si le fichier a l'extension .prom,
+        au format JSON sinon.
+
+        Paramètres :
+        - path (str): Chemin du fichier de sortie.
+        """
+        with open(path, 'w') as file:
+            if path.endswith('.prom'):
+                file.write(self.to_prometheus())
+            else:
+                json.dump(self.to_dict(), file, indent=2)
@@ -0,0 +1,90 @@
+import json
+import pstats
+
+from indexation_web_metrics import Metrics
+
+
+def test_disabled_metrics_record_nothing():
+    metrics = Metrics()
+    with metrics.timer('fetch'):
+        pass
+    metrics.increment('pages_crawled')
+    metrics.merge({'timers': {'score': {'seconds': 1.0, 'calls': 1}}, 'counters': {'queries': 1}})
+    with metrics.profiling():
+        pass
+
+    assert metrics.to_dict() == {'timers': {}, 'counters': {}}
+    assert metrics.profile_stats() == ''
+
+
+def test_enabled_metrics_record_timers_and_counters():
+    metrics = Metrics(enabled=True)
+    for _ in range(3):
+        with metrics.timer('fetch'):
+            pass
+    metrics.increment('links_found', 5)
+    metrics.increment('links_found')
+
+    assert metrics.timer_calls['fetch'] == 3
+    assert metrics.timers['fetch'] >= 0
+    assert metrics.to_dict()['counters'] == {'links_found': 6}
+
+
+def test_merge_adds_exported_metrics():
+    metrics = Metrics(enabled=True)
+    metrics.increment('queries')
+    other = Metrics(enabled=True)
+    with other.timer('score'):
+        pass
+    other.increment('queries', 2)
+
+    metrics.merge(other.to_dict())
+    metrics.merge(other.to_dict())
+
+    assert metrics.counters['queries'] == 5
+    assert metrics.timer_calls['score'] == 2
+
+
+def test_to_prometheus_format():
+    metrics = Metrics(enabled=True, prefix='test')
+    metrics.timers['fetch'] = 1.5
+    metrics.timer_calls['fetch'] = 2
+    metrics.increment('errors', 3)
+
+    assert metrics.to_prometheus() == ('# TYPE test_stage_seconds_total counter\n'
+                                       'test_stage_seconds_total{stage="fetch"} 1.5\n'
+                                       '# TYPE test_stage_calls_total counter\n'
+                                       'test_stage_calls_total{stage="fetch"} 2\n'
+                                       '# TYPE test_errors_total counter\n'
+                                       'test_errors_total 3\n')
+
+
+def test_dump_format_depends_on_extension(tmp_path):
+    metrics = Metrics(enabled=True)
+    with metrics.timer('parse'):
+        pass
+    metrics.increment('pages_crawled')
+
+    metrics.dump(str(tmp_path / 'metrics.prom'))
+    metrics.dump(str(tmp_path / 'metrics.json'))
+
+    assert (tmp_path / 'metrics.prom').read_text() == metrics.to_prometheus()
+    with open(tmp_path / 'metrics.json') as file:
+        assert json.load(file) == metrics.to_dict()
+
+
+def profiled_function():
+    return sum(range(10))
+
+
+def test_profiling_accumulates_runs(tmp_path):
+    metrics = Metrics(profile=True)
+    for _ in range(3):
+        with metrics.profiling():
+            profiled_function()
+
+    stats = pstats.Stats(metrics.profiler).stats
+    assert [calls for (_, _, function), (calls, *_) in stats.items() if function == 'profiled_function'] == [3]
+    assert 'profiled_function' in metrics.profile_stats()
+    metrics.dump_profile(str(tmp_path / 'run.pstats'))
+    assert (tmp_path / 'run.pstats').stat().st_size > 0
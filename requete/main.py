@@ -5,15 +5,332 @@ import nltk
 from nltk import word_tokenize
 from math import log
 import os
+import glob
+import heapq
+from bisect import bisect_left
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from indexation_web_metrics import Metrics
+
+def bounded_levenshtein(word_1, word_2, max_distance):
+    """
+    Calcule la distance de Levenshtein entre deux mots, en s'arrêtant dès qu'elle dépasse max_distance.
+
+    Paramètres :
+    - word_1 (str): Premier mot.
+    - word_2 (str): Second mot.
+    - max_distance (int): Distance maximale recherchée.
+
+    Sortie :
+    - int: Distance de Levenshtein, ou max_distance + 1 si elle est supérieure à max_distance.
+    """
+    if abs(len(word_1) - len(word_2)) > max_distance:
+        return max_distance + 1
+    previous_row = list(range(len(word_2) + 1))
+    for i, char_1 in enumerate(word_1, 1):
+        current_row = [i]
+        for j, char_2 in enumerate(word_2, 1):
+            current_row.append(min(previous_row[j] + 1, 
+                                   current_row[j - 1] + 1, 
+                                   previous_row[j - 1] + (char_1 != char_2)))
+        if min(current_row) > max_distance:
+            return max_distance + 1
+        previous_row = current_row
+    return min(previous_row[-1], max_distance + 1)
+
+
+class TermDictionary:
+    def __init__(self, terms, max_edit_distance=None, frequency=None, nb_completions=10, completion_prefix_length=3):
+        """
+        Initialise un dictionnaire de termes compact : un tableau trié pour l'énumération par préfixe et, si max_edit_distance
+        est spécifié, un index des suppressions (SymSpell) pour la recherche tolérante aux fautes.
+
+        Les nb_completions termes les plus fréquents de chaque préfixe d'au plus completion_prefix_length caractères sont
+        précalculés : ce sont les préfixes dont l'énumération est la plus coûteuse (le préfixe 'a' couvre une grande partie
+        du vocabulaire). Les préfixes plus longs couvrent peu de termes et sont énumérés à la demande.
+
+        L'index des suppressions est construit ici, une seule fois. Chaque variante d'un terme (obtenue en supprimant jusqu'à
+        max_edit_distance caractères) y est stockée comme un entier de 64 bits (empreinte de la variante et position du terme)
+        dans un tableau trié. Un terme de longueur L a environ L + 1 variantes pour une distance de 1 et L² / 2 pour une
+        distance de 2 : pour un million de termes et une distance de 1, l'index occupe environ 65 Mo (environ 400 Mo pendant
+        la construction, qui prend une quinzaine de secondes).
+
+        Paramètres :
+        - terms (iterable): Termes du vocabulaire.
+        - max_edit_distance (int): Distance d'édition maximale de la recherche tolérante aux fautes (pas d'index des suppressions si None).
+        - frequency (callable): Fonction qui retourne la fréquence d'un terme, utilisée pour classer les complétions (ordre alphabétique si None).
+        - nb_completions (int): Nombre de complétions précalculées par préfixe.
+        - completion_prefix_length (int): Longueur maximale des préfixes dont les complétions sont précalculées.
+        """
+        self.terms = sorted(set(terms))
+        self.max_edit_distance = max_edit_distance
+        self.frequencies = array('q', map(frequency, self.terms) if frequency is not None else [0] * len(self.terms))
+        self.nb_completions = nb_completions
+        self.completion_prefix_length = completion_prefix_length
+        self.build_completions()
+        # Nombre de bits réservés à la position du terme, le reste de l'entier contient l'empreinte de la variante
+        self.position_bits = max(len(self.terms).bit_length(), 1)
+        self.deletes = None
+        if max_edit_distance is not None:
+            self.build_deletes()
+
+    def __contains__(self, term):
+        position = bisect_left(self.terms, term)
+        return position < len(self.terms) and self.terms[position] == term
+
+    def __len__(self):
+        return len(self.terms)
+
+    def prefix_range(self, prefix, start=0):
+        """
+        Retourne l'intervalle des positions des termes commençant par un préfixe.
+
+        Paramètres :
+        - prefix (str): Préfixe recherché (non vide).
+        - start (int): Position à partir de laquelle chercher.
+
+        Sortie :
+        - tuple: (Position du premier terme, Position suivant le dernier terme).
+        """
+        start = bisect_left(self.terms, prefix, start)
+        # Premier mot qui suit tous les mots commençant par le préfixe
+        upper_bound = prefix[:-1] + chr(min(ord(prefix[-1]) + 1, 0x10FFFF))
+        return start, bisect_left(self.terms, upper_bound, start)
+
+    def prefix_search(self, prefix, nb_terms=None):
+        """
+        Énumère les termes commençant par un préfixe, par ordre alphabétique.
+
+        Paramètres :
+        - prefix (str): Préfixe recherché.
+        - nb_terms (int): Nombre maximal de termes retournés (tous si None).
+
+        Sortie :
+        - list: Termes commençant par le préfixe.
+        """
+        if not prefix:
+            return self.terms[:nb_terms]
+        start, end = self.prefix_range(prefix)
+        if nb_terms is not None:
+            end = min(end, start + nb_terms)
+        return self.terms[start:end]
+
+    def build_completions(self):
+        """
+        Précalcule, pour chaque préfixe d'au plus completion_prefix_length caractères, les positions des nb_completions
+        termes les plus fréquents commençant par ce préfixe (ordre alphabétique en cas d'égalité).
+        """
+        self.completions = {}
+        for prefix_length in range(1, self.completion_prefix_length + 1):
+            position = 0
+            while position < len(self.terms):
+                term = self.terms[position]
+                if len(term) < prefix_length:
+                    position += 1
+                    continue
+                start, end = self.prefix_range(term[:prefix_length], position)
+                # nlargest est stable : à fréquence égale, les termes restent dans l'ordre alphabétique
+                self.completions[term[:prefix_length]] = array('l', heapq.nlargest(self.nb_completions, 
+                                                                                   range(start, end), 
+                                                                                   key=self.frequencies.__getitem__))
+                position = end
+
+    def top_completions(self, prefix, nb_terms=10):
+        """
+        Retourne les termes les plus fréquents commençant par un préfixe.
+
+        Paramètres :
+        - prefix (str): Préfixe recherché (non vide).
+        - nb_terms (int): Nombre maximal de termes retournés.
+
+        Sortie :
+        - list: Termes commençant par le préfixe, par fréquence décroissante puis par ordre alphabétique.
+        """
+        if len(prefix) <= self.completion_prefix_length and nb_terms <= self.nb_completions:
+            positions = self.completions.get(prefix, [])[:nb_terms]
+        else:
+            start, end = self.prefix_range(prefix)
+            positions = heapq.nlargest(nb_terms, range(start, end), key=self.frequencies.__getitem__)
+        return [self.terms[position] for position in positions]
+
+    def generate_deletes(self, word):
+        """
+        Génère les variantes d'un mot obtenues en supprimant jusqu'à max_edit_distance caractères.
+
+        Paramètres :
+        - word (str): Mot.
+
+        Sortie :
+        - set: Variantes du mot (le mot lui-même inclus).
+        """
+        deletes = {word}
+        level = {word}
+        for _ in range(self.max_edit_distance):
+            level = {variant[:i] + variant[i + 1:] for variant in level for i in range(len(variant))}
+            deletes |= level
+        return deletes
+
+    def variant_key(self, variant):
+        """
+        Retourne l'empreinte d'une variante, décalée pour laisser la place à la position du terme.
+        """
+        return (hash(variant) & ((1 << (63 - self.position_bits)) - 1)) << self.position_bits
+
+    def build_deletes(self):
+        """
+        Construit l'index des suppressions : un tableau trié d'entiers (empreinte de la variante, position du terme).
+        """
+        keys = [self.variant_key(variant) | position 
+                for position, term in enumerate(self.terms) 
+                for variant in self.generate_deletes(term)]
+        keys.sort()
+        self.deletes = array('q', keys)
+
+    def fuzzy_search(self, word):
+        """
+        Recherche les termes à une distance de Levenshtein d'au plus max_edit_distance d'un mot.
+        Les collisions d'empreintes sont éliminées par le calcul de la distance.
+
+        Paramètres :
+        - word (str): Mot recherché.
+
+        Sortie :
+        - list: Liste de tuples (terme, distance), triée par distance croissante puis par ordre alphabétique.
+        """
+        if self.deletes is None:
+            raise ValueError("La recherche tolérante aux fautes nécessite un TermDictionary construit avec max_edit_distance")
+        position_mask = (1 << self.position_bits) - 1
+        candidates = set()
+        for variant in self.generate_deletes(word):
+            key = self.variant_key(variant)
+            i = bisect_left(self.deletes, key)
+            while i < len(self.deletes) and self.deletes[i] & ~position_mask == key:
+                candidates.add(self.deletes[i] & position_mask)
+                i += 1
+
+        results = []
+        for position in candidates:
+            term = self.terms[position]
+            distance = bounded_levenshtein(word, term, self.max_edit_distance)
+            if distance <= self.max_edit_distance:
+                results.append((term, distance))
+        return sorted(results, key=lambda x: (x[1], x[0]))
+
+
+class QueryProcessor:
+    """
+    Traitements communs aux systèmes de ranking : tokenisation, autocomplétion et correction des requêtes, exécution d'une requête.
+    Les sous-classes définissent metrics, nb_results, fuzzy, collection_statistics, term_dictionary et la méthode search.
+    """
+
+    def document_frequency(self, term : str):
+        """
+        Retourne la fréquence documentaire d'un terme dans les champs de la recherche (titre et contenu),
+        utilisée pour classer les complétions et les corrections.
+
+        Paramètres :
+        - term (str): Terme.
+
+        Sortie :
+        - int: Nombre de titres et de contenus contenant le terme.
+        """
+        return (self.collection_statistics['document_frequencies'].get(term, 0) 
+                + self.collection_statistics['title_document_frequencies'].get(term, 0))
+
+    def tokenize_query(self, query : str):
+        """
+        Tokenise une requête en utilisant la tokenization de nltk.
+
+        Paramètres :
+        - query (str): Requête de l'utilisateur.
+
+        Sortie :
+        - list: Liste de tokens.
+        """
+        # Tokenization avec un split sur les espaces
+        with self.metrics.timer('tokenize_query'):
+            tokens = word_tokenize(query, 'french')
+            tokens = [token.lower() for token in tokens]
+        return tokens
+
+    def autocomplete(self, query : str, nb_suggestions=10):
+        """
+        Complète le dernier mot d'une requête en cours de saisie avec les termes du vocabulaire les plus fréquents.
+
+        Paramètres :
+        - query (str): Début de la requête de l'utilisateur.
+        - nb_suggestions (int): Nombre maximal de suggestions.
+
+        Sortie :
+        - list: Requêtes complétées, par fréquence documentaire (titre et contenu) décroissante du dernier mot.
+        """
+        words = query.lower().split()
+        if not words or query[-1].isspace():
+            return []
+        completions = self.term_dictionary.top_completions(words[-1], nb_suggestions)
+        return [' '.join(words[:-1] + [completion]) for completion in completions]
+
+    def correct_query_tokens(self, query_tokens, min_token_length=3):
+        """
+        Remplace chaque token absent du vocabulaire par le terme le plus proche (distance d'édition la plus faible,
+        puis fréquence documentaire la plus élevée). Les tokens sans terme proche sont conservés, ainsi que les tokens
+        non alphabétiques (ponctuation, nombres) et les tokens courts, qu'une seule modification suffit à transformer
+        en un autre terme du vocabulaire.
 
-class RankingSystem:
+        Paramètres :
+        - query_tokens (list): Liste de tokens de la requête.
+        - min_token_length (int): Longueur minimale des tokens corrigés.
+
+        Sortie :
+        - list: Liste de tokens corrigés.
+
+        Nécessite un dictionnaire de termes construit avec fuzzy=True.
+        """
+        corrected_tokens = []
+        with self.metrics.timer('correct_query'):
+            for token in query_tokens:
+                if token.isalpha() and len(token) >= min_token_length and token not in self.term_dictionary:
+                    candidates = self.term_dictionary.fuzzy_search(token)
+                    if candidates:
+                        token = min(candidates, key=lambda x: (x[1], -self.document_frequency(x[0]), x[0]))[0]
+                        self.metrics.increment('corrected_tokens')
+                corrected_tokens.append(token)
+        return corrected_tokens
+
+    def run_query(self, user_query):
+        """
+        Exécute une requête de l'utilisateur.
+
+        Paramètres :
+        - user_query (str): Requête de l'utilisateur.
+
+        Sortie :
+        - tuple: (Liste de résultats triés, Nombre de documents ayant survécu au filtre).
+        """
+        with self.metrics.profiling():
+            query_tokens = self.tokenize_query(user_query)
+            if self.fuzzy == True : 
+                query_tokens = self.correct_query_tokens(query_tokens)
+            ranked_documents, nb_filtered_documents = self.search(query_tokens)
+        self.metrics.increment('queries')
+        results = [{'title': doc['title'], 'url': doc['url']} for doc in ranked_documents[:self.nb_results]]
+        write_results(results)
+        return results, nb_filtered_documents
+
+
+class RankingSystem(QueryProcessor):
     def __init__(self, 
                  index_title_file='./requete/title_pos_index.json', 
                  index_content_file='./requete/content_pos_index.json', 
                  documents_file='./requete/documents.json',
                  nb_results=10, 
                  all_token=True, 
-                 naive_ranking=True):
+                 naive_ranking=True,
+                 collection_statistics=None,
+                 metrics=None,
+                 fuzzy=False,
+                 max_edit_distance=1):
         """
         Initialise l'objet RankingSystem avec les paramètres spécifiés.
 
@@ -24,13 +341,28 @@ class RankingSystem:
         - nb_results (int): Nombre de résultats à retourner.
         - all_token (bool): Indique si tous les tokens de la requête doivent être présents dans les documents filtrés.
         - naive_ranking (bool): Indique si le ranking doit être effectué de manière naïve (par comptage) ou avec le score BM25.
+        - collection_statistics (dict): Statistiques de la collection utilisées par BM25 (calculées sur les documents chargés si None).
+        - metrics (Metrics): Instrumentation des étapes de la requête (tokenize_query, filter, score, sort), désactivée si None.
+        - fuzzy (bool): Indique si les tokens absents des index doivent être remplacés par le terme le plus proche du dictionnaire
+          (l'index de la recherche tolérante aux fautes est alors construit à l'initialisation).
+        - max_edit_distance (int): Distance d'édition maximale pour la correction des tokens.
         """
+        self.metrics = metrics if metrics is not None else Metrics()
         self.index_title = self.load_json(index_title_file)
         self.index_content = self.load_json(index_content_file)
         self.documents = self.load_json(documents_file)
+        self.documents_by_id = {document["id"]: document for document in self.documents}
         self.nb_results = nb_results
         self.all_token = all_token
         self.naive_ranking = naive_ranking
+        if collection_statistics is None : 
+            collection_statistics = self.calculate_collection_statistics()
+        self.collection_statistics = collection_statistics
+        # Dictionnaire des termes des champs de la recherche (titre et contenu)
+        self.term_dictionary = TermDictionary(set(self.index_title) | set(self.index_content), 
+                                              max_edit_distance if fuzzy else None, 
+                                              frequency=self.document_frequency)
+        self.fuzzy = fuzzy
 
     def load_json(self, index_file : str):
         """
@@ -45,20 +377,20 @@ class RankingSystem:
         with open(index_file, 'r') as file:
             return json.load(file)
 
-    def tokenize_query(self, query : str):
+    def calculate_collection_statistics(self):
         """
-        Tokenise une requête en utilisant la tokenization de nltk.
-
-        Paramètres :
-        - query (str): Requête de l'utilisateur.
+        Calcule les statistiques de la collection nécessaires au score BM25.
+        Elles sont additives : les statistiques des shards, écrites par IndexWeb.build_shards (TP Index), sont fusionnées avec merge_collection_statistics.
 
         Sortie :
-        - list: Liste de tokens.
+        - dict: Nombre de documents, longueur totale des contenus et fréquence documentaire de chaque terme (contenu et titre).
         """
-        # Tokenization avec un split sur les espaces
-        tokens = word_tokenize(query, 'french')
-        tokens = [token.lower() for token in tokens]
-        return tokens
+        return {
+            'num_documents': len(self.documents),
+            'total_doc_length': sum(len(doc["content"]) for doc in self.documents),
+            'document_frequencies': {term: len(postings) for term, postings in self.index_content.items()},
+            'title_document_frequencies': {term: len(postings) for term, postings in self.index_title.items()}
+        }
 
     def filter_documents_all_token(self, query_tokens):
         """
@@ -128,32 +460,28 @@ class RankingSystem:
         # Initialiser le score pour chaque document
         document_scores = defaultdict(float)
 
-        # Parcourir chaque terme de la requête
-        for query_token in query_tokens:
-
-            # Vérifier si le terme est présent dans l'index
-            if query_token in self.index_title.keys():
+        with self.metrics.timer('score'):
+            # Parcourir chaque terme de la requête
+            for query_token in query_tokens:
 
-                # Parcourir chaque document contenant le terme
-                for doc in filtered_documents:
-                    # Augmenter le score du document en fonction du nombre d'occurrences du terme
-                    try: 
-                        score_title = len(self.index_title[query_token][str(doc["id"])]) / len(doc["title"])
-                    except: 
-                        score_title = 0
-                    try: 
-                        score_content = len(self.index_content[query_token][str(doc["id"])]) / len(doc["content"])
-                    except: 
-                        score_content = 0
+                # Vérifier si le terme est présent dans l'index des titres (de toute la collection si l'index est partitionné)
+                if query_token in self.collection_statistics['title_document_frequencies']:
 
-                    document_scores[doc["id"]] += score_title + score_content
+                    # Parcourir chaque document contenant le terme
+                    for doc in filtered_documents:
+                        # Augmenter le score du document en fonction du nombre d'occurrences du terme
+                        try: 
+                            score_title = len(self.index_title[query_token][str(doc["id"])]) / len(doc["title"])
+                        except: 
+                            score_title = 0
+                        try: 
+                            score_content = len(self.index_content[query_token][str(doc["id"])]) / len(doc["content"])
+                        except: 
+                            score_content = 0
 
-        # Trier les documents en fonction de leur score décroissant
-        ranked_documents = sorted(document_scores.items(), key=lambda x: x[1], reverse=True)
+                        document_scores[doc["id"]] += score_title + score_content
 
-        # Récupérer les détails des documents classés
-        results = [{'title': self.documents[doc_id]['title'], 'url': self.documents[doc_id]['url']} for doc_id, _ in ranked_documents]
-        return results
+        return self.sort_results(document_scores)
 
     def bm25_score(self, query, document, k1=1.5, b=0.75):
         """
@@ -169,12 +497,12 @@ class RankingSystem:
         - float: Score BM25.
         """
         doc_length = len(document["content"])
-        avg_doc_length = sum(len(doc["content"]) for doc in self.documents) / len(self.documents)
-        num_documents = len(self.documents)
+        num_documents = self.collection_statistics['num_documents']
+        avg_doc_length = self.collection_statistics['total_doc_length'] / num_documents
 
         score = 0
         for term in query:
-            df = sum(1 for doc in self.documents if term in doc)
+            df = self.collection_statistics['document_frequencies'].get(term, 0)
             idf = log((num_documents - df + 0.5) / (df + 0.5) + 1.0)
 
             tf = document["content"].count(term)
@@ -198,44 +526,261 @@ class RankingSystem:
         """
         document_scores = defaultdict(float)
 
-        for doc in filtered_documents:
-            score = self.bm25_score(query, doc)
-            document_scores[doc["id"]] += score
+        with self.metrics.timer('score'):
+            for doc in filtered_documents:
+                score = self.bm25_score(query, doc)
+                document_scores[doc["id"]] += score
+
+        return self.sort_results(document_scores)
 
-        # Trier les documents en fonction de leur score décroissant
-        ranked_documents = sorted(document_scores.items(), key=lambda x: x[1], reverse=True)
+    def sort_results(self, document_scores):
+        """
+        Trie les documents par score décroissant (à score égal, par identifiant croissant) et récupère leurs détails.
+
+        Paramètres :
+        - document_scores (dict): Score de chaque document, indexé par identifiant.
 
-        # Récupérer les détails des documents classés
-        results = [{'title': self.documents[doc_id]['title'], 'url': self.documents[doc_id]['url']} for doc_id, _ in ranked_documents]
+        Sortie :
+        - list: Liste de résultats triés, contenant le titre, l'url, l'identifiant et le score de chaque document.
+        """
+        with self.metrics.timer('sort'):
+            ranked_documents = sorted(document_scores.items(), key=lambda x: (-x[1], x[0]))
+            results = [{'title': self.documents_by_id[doc_id]['title'], 
+                        'url': self.documents_by_id[doc_id]['url'], 
+                        'id': doc_id, 
+                        'score': score} for doc_id, score in ranked_documents]
         return results
 
-    def run_query(self, user_query):
+    def search(self, query_tokens):
         """
-        Exécute une requête de l'utilisateur.
+        Filtre et classe les documents pour une requête déjà tokenisée.
 
         Paramètres :
-        - user_query (str): Requête de l'utilisateur.
+        - query_tokens (list): Liste de tokens de la requête.
 
         Sortie :
         - tuple: (Liste de résultats triés, Nombre de documents ayant survécu au filtre).
         """
-        query_tokens = self.tokenize_query(user_query)
-        if self.all_token == True : 
-            filtered_documents = self.filter_documents_all_token(query_tokens)
-        else : 
-            filtered_documents = self.filter_documents(query_tokens)
+        with self.metrics.timer('filter'):
+            if self.all_token == True : 
+                filtered_documents = self.filter_documents_all_token(query_tokens)
+            else : 
+                filtered_documents = self.filter_documents(query_tokens)
+        self.metrics.increment('filtered_documents', len(filtered_documents))
         if self.naive_ranking == True: 
             ranked_documents = self.linear_naive_ranking(query_tokens, filtered_documents)
         else : 
             ranked_documents = self.linear_ranking_with_bm25(query_tokens, filtered_documents)
+        return ranked_documents, len(filtered_documents)
+
+
+def write_results(results, results_file="./requete/results.json"):
+    """
+    Écrit les résultats d'une requête dans un fichier JSON.
+
+    Paramètres :
+    - results (list): Liste de résultats triés.
+    - results_file (str): Chemin vers le fichier JSON de résultats.
+    """
+    if os.path.exists(results_file):
+        os.remove(results_file)
+    with open(results_file, "w", encoding="utf-8") as fichier_json:
+        json.dump(results, fichier_json, ensure_ascii=False, indent=2)
+
+
+def merge_collection_statistics(statistics_list):
+    """
+    Fusionne les statistiques de collection de plusieurs shards en statistiques globales.
+
+    Paramètres :
+    - statistics_list (list): Liste des statistiques de chaque shard.
+
+    Sortie :
+    - dict: Statistiques globales de la collection.
+    """
+    document_frequencies = defaultdict(int)
+    title_document_frequencies = defaultdict(int)
+    for statistics in statistics_list:
+        for term, df in statistics['document_frequencies'].items():
+            document_frequencies[term] += df
+        for term, df in statistics['title_document_frequencies'].items():
+            title_document_frequencies[term] += df
+    return {
+        'num_documents': sum(statistics['num_documents'] for statistics in statistics_list),
+        'total_doc_length': sum(statistics['total_doc_length'] for statistics in statistics_list),
+        'document_frequencies': dict(document_frequencies),
+        'title_document_frequencies': dict(title_document_frequencies)
+    }
+
+
+# Système de ranking du shard chargé dans le processus worker courant, ou erreur survenue lors de son chargement
+_shard_ranking_system = None
+_shard_load_error = None
+
+def _load_shard(shard_dir, nb_results, all_token, naive_ranking, metrics_enabled):
+    """
+    Initialise un processus worker en chargeant le système de ranking de son shard.
+    Une erreur de chargement est conservée pour être renvoyée au coordinateur par la première tâche
+    (une exception levée ici rendrait le pool inutilisable sans indiquer sa cause).
+    """
+    global _shard_ranking_system, _shard_load_error
+    try:
+        _shard_ranking_system = RankingSystem(index_title_file=os.path.join(shard_dir, 'title.pos_index.json'),
+                                              index_content_file=os.path.join(shard_dir, 'content.pos_index.json'),
+                                              documents_file=os.path.join(shard_dir, 'documents.json'),
+                                              nb_results=nb_results,
+                                              all_token=all_token,
+                                              naive_ranking=naive_ranking,
+                                              metrics=Metrics(enabled=metrics_enabled))
+    except Exception as error:
+        _shard_load_error = error
+
+def _get_shard_ranking_system():
+    """
+    Retourne le système de ranking du shard, ou lève l'erreur survenue lors de son chargement.
+    """
+    if _shard_load_error is not None:
+        raise _shard_load_error
+    return _shard_ranking_system
+
+def _shard_terms():
+    """
+    Retourne les termes du dictionnaire du shard.
+    """
+    return _get_shard_ranking_system().term_dictionary.terms
+
+def _set_shard_collection_statistics(collection_statistics):
+    """
+    Remplace les statistiques locales du shard par les statistiques globales.
+    """
+    _get_shard_ranking_system().collection_statistics = collection_statistics
+
+def _search_shard(query_tokens):
+    """
+    Exécute une requête tokenisée sur le shard et retourne son top nb_results local et les métriques de la requête.
+    """
+    ranking_system = _get_shard_ranking_system()
+    metrics = ranking_system.metrics = Metrics(enabled=ranking_system.metrics.enabled)
+    ranked_documents, nb_filtered_documents = ranking_system.search(query_tokens)
+    return ranked_documents[:ranking_system.nb_results], nb_filtered_documents, metrics.to_dict()
+
+
+class ShardedRankingSystem(QueryProcessor):
+    def __init__(self, 
+                 shards_dir='./index/sharded_index', 
+                 nb_results=10, 
+                 all_token=True, 
+                 naive_ranking=True,
+                 metrics=None,
+                 fuzzy=False,
+                 max_edit_distance=1):
+        """
+        Initialise un coordinateur qui répartit les requêtes entre des shards, chacun chargé dans son propre processus.
+        Les statistiques de collection de tous les shards sont fusionnées afin que les résultats (ranking naïf ou BM25)
+        soient identiques à ceux d'un index non partitionné. Les processus sont arrêtés par close(), ou en sortie d'un bloc with.
+
+        Paramètres :
+        - shards_dir (str): Chemin vers le dossier contenant un sous-dossier par shard, écrit par IndexWeb.save_shards
+          (metadata.json, title.pos_index.json, content.pos_index.json, documents.json).
+        - nb_results (int): Nombre de résultats à retourner.
+        - all_token (bool): Indique si tous les tokens de la requête doivent être présents dans les documents filtrés.
+        - naive_ranking (bool): Indique si le ranking doit être effectué de manière naïve (par comptage) ou avec le score BM25.
+        - metrics (Metrics): Instrumentation du coordinateur (tokenize_query, scatter_gather, merge) et des shards
+          (filter, score, sort, cumulés sur tous les shards), désactivée si None. Le profilage cProfile ne couvre que
+          le coordinateur, pas les processus des shards.
+        - fuzzy (bool): Indique si les tokens absents des index doivent être remplacés par le terme le plus proche du dictionnaire
+          (l'index de la recherche tolérante aux fautes est alors construit à l'initialisation).
+        - max_edit_distance (int): Distance d'édition maximale pour la correction des tokens.
+        """
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.shard_dirs = sorted(glob.glob(os.path.join(shards_dir, 'shard_*')))
+        if not self.shard_dirs:
+            raise FileNotFoundError(f"Aucun shard (dossier shard_*) trouvé dans {shards_dir}")
+        self.nb_results = nb_results
+        self.all_token = all_token
+        self.naive_ranking = naive_ranking
+
+        # Un processus par shard : chaque shard reste chargé en mémoire dans son worker
+        self.executors = [ProcessPoolExecutor(max_workers=1, 
+                                              initializer=_load_shard, 
+                                              initargs=(shard_dir, nb_results, all_token, naive_ranking, self.metrics.enabled)) 
+                          for shard_dir in self.shard_dirs]
+
+        try:
+            # Statistiques de collection de chaque shard, calculées par IndexWeb.build_shards
+            statistics_list = []
+            for shard_dir in self.shard_dirs:
+                try:
+                    with open(os.path.join(shard_dir, 'metadata.json'), 'r') as file:
+                        statistics_list.append(json.load(file))
+                except Exception as error:
+                    raise RuntimeError(f"Erreur lors du chargement du shard {shard_dir} : {error}") from error
+            self.collection_statistics = merge_collection_statistics(statistics_list)
+            self.scatter(_set_shard_collection_statistics, self.collection_statistics)
+            shard_terms = self.scatter(_shard_terms)
+        except Exception:
+            self.close()
+            raise
+
+        # Dictionnaire de termes global, union des dictionnaires des shards
+        self.term_dictionary = TermDictionary((term for terms in shard_terms for term in terms), 
+                                              max_edit_distance if fuzzy else None, 
+                                              frequency=self.document_frequency)
+        self.fuzzy = fuzzy
+
+    def scatter(self, function, *args):
+        """
+        Exécute une fonction sur tous les shards en parallèle et retourne leurs résultats.
+
+        Paramètres :
+        - function (callable): Fonction à exécuter dans chaque worker.
+        - args: Arguments de la fonction.
+
+        Sortie :
+        - list: Résultat de chaque shard.
+        """
+        futures = [executor.submit(function, *args) for executor in self.executors]
+        results = []
+        for shard_dir, future in zip(self.shard_dirs, futures):
+            try:
+                results.append(future.result())
+            except Exception as error:
+                raise RuntimeError(f"Erreur dans le shard {shard_dir} : {error}") from error
+        return results
+
+    def search(self, query_tokens):
+        """
+        Envoie la requête tokenisée à tous les shards et fusionne leurs top nb_results locaux en un top global.
+
+        Paramètres :
+        - query_tokens (list): Liste de tokens de la requête.
+
+        Sortie :
+        - tuple: (Liste de résultats triés, Nombre de documents ayant survécu au filtre).
+        """
+        with self.metrics.timer('scatter_gather'):
+            shard_results = self.scatter(_search_shard, query_tokens)
+        for _, _, shard_metrics in shard_results:
+            self.metrics.merge(shard_metrics)
+        with self.metrics.timer('merge'):
+            ranked_documents = heapq.nsmallest(self.nb_results, 
+                                               (doc for results, _, _ in shard_results for doc in results), 
+                                               key=lambda doc: (-doc['score'], doc['id']))
+        return ranked_documents, sum(nb_filtered_documents for _, nb_filtered_documents, _ in shard_results)
+
+    def close(self):
+        """
+        Arrête les processus workers des shards.
+        """
+        for executor in self.executors:
+            executor.shutdown()
+
+    def __enter__(self):
+        return self
 
-        # Écriture dans le fichier JSON
-        if os.path.exists("./requete/results.json"):
-            os.remove("./requete/results.json")
-        with open("./requete/results.json", "w", encoding="utf-8") as fichier_json:
-            json.dump(ranked_documents[:self.nb_results], fichier_json, ensure_ascii=False, indent=2)
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
-        return ranked_documents[:self.nb_results], len(filtered_documents)
 
 if __name__ == "__main__":
     # Exemple d'utilisation
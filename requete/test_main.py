@@ -0,0 +1,188 @@
+import importlib.util
+import json
+import multiprocessing
+import os
+import random
+
+import pytest
+
+pytest.importorskip("nltk")
+
+from main import RankingSystem, ShardedRankingSystem, TermDictionary
+from indexation_web_metrics import Metrics
+
+NB_DOCUMENTS = 30
+NB_SHARDS = 4
+QUERIES = [['w1'], ['w3'], ['w0', 'w5'], ['w2', 'w7', 'w9'], ['w4', 'w4'], ['w6', 'absent']]
+
+
+def write_json(path, data):
+    with open(path, 'w') as file:
+        json.dump(data, file)
+
+
+def build_positional_index(documents, field):
+    index = {}
+    for document in documents:
+        for position, token in enumerate(document[field].split()):
+            index.setdefault(token, {}).setdefault(str(document["id"]), []).append(position)
+    return index
+
+
+def load_index_web():
+    """
+    Charge la classe IndexWeb du TP Index (dont le module s'appelle aussi main.py).
+    """
+    pytest.importorskip("spacy")
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'index', 'main.py')
+    spec = importlib.util.spec_from_file_location('index_main', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.IndexWeb
+
+
+@pytest.fixture
+def collection(tmp_path, monkeypatch):
+    """
+    Construit avec IndexWeb un index complet et le même index partitionné en NB_SHARDS shards.
+    La tokenisation spaCy est remplacée par un découpage sur les espaces.
+    """
+    rng = random.Random(0)
+    vocabulary = [f'w{i}' for i in range(10)]
+    crawled_urls = [{'url': f'https://example.com/{id}',
+                     'title': ' '.join(rng.choices(vocabulary, k=rng.randint(1, 3))),
+                     'content': ' '.join(rng.choices(vocabulary, k=rng.randint(5, 20))),
+                     'h1': ' '.join(rng.choices(vocabulary, k=2))} for id in range(NB_DOCUMENTS)]
+    write_json(tmp_path / 'crawled_urls.json', crawled_urls)
+
+    IndexWeb = load_index_web()
+    tokenized = [[url[field].split() for field in ['title', 'content', 'h1']] for url in crawled_urls]
+    monkeypatch.setattr(IndexWeb, 'tokenize_document', lambda self: (tokenized, tokenized))
+    index_web = IndexWeb(str(tmp_path / 'crawled_urls.json'))
+
+    documents = [{'id': id, 'url': url['url'], 'title': url['title'], 'content': url['content']} for id, url in enumerate(crawled_urls)]
+    write_json(tmp_path / 'documents.json', documents)
+    index_web.save_json(index_web.build_positional_index('title'), str(tmp_path / 'title.pos_index.json'))
+    index_web.save_json(index_web.build_positional_index('content'), str(tmp_path / 'content.pos_index.json'))
+    index_web.save_shards(index_web.build_shards(NB_SHARDS), str(tmp_path / 'sharded_index'))
+    return tmp_path
+
+
+def test_build_shards_partitions_documents_and_writes_statistics(collection):
+    for shard in range(NB_SHARDS):
+        shard_dir = collection / 'sharded_index' / f'shard_{shard}'
+        shard_ranking_system = RankingSystem(index_title_file=shard_dir / 'title.pos_index.json',
+                                             index_content_file=shard_dir / 'content.pos_index.json',
+                                             documents_file=shard_dir / 'documents.json')
+        assert [document['id'] for document in shard_ranking_system.documents] == list(range(shard, NB_DOCUMENTS, NB_SHARDS))
+        with open(shard_dir / 'metadata.json') as file:
+            assert json.load(file) == shard_ranking_system.calculate_collection_statistics()
+
+
+@pytest.mark.parametrize('naive_ranking', [True, False])
+@pytest.mark.parametrize('all_token', [True, False])
+def test_sharded_search_matches_unsharded(collection, naive_ranking, all_token):
+    ranking_system = RankingSystem(index_title_file=collection / 'title.pos_index.json',
+                                   index_content_file=collection / 'content.pos_index.json',
+                                   documents_file=collection / 'documents.json',
+                                   nb_results=5, all_token=all_token, naive_ranking=naive_ranking)
+    with ShardedRankingSystem(shards_dir=collection / 'sharded_index',
+                              nb_results=5, all_token=all_token, naive_ranking=naive_ranking) as sharded_ranking_system:
+        for query_tokens in QUERIES:
+            ranked_documents, nb_filtered_documents = ranking_system.search(query_tokens)
+            assert sharded_ranking_system.search(query_tokens) == (ranked_documents[:5], nb_filtered_documents)
+
+
+def test_sharded_metrics_include_shard_stages(collection):
+    metrics = Metrics(enabled=True)
+    sharded_metrics = Metrics(enabled=True)
+    ranking_system = RankingSystem(index_title_file=collection / 'title.pos_index.json',
+                                   index_content_file=collection / 'content.pos_index.json',
+                                   documents_file=collection / 'documents.json',
+                                   all_token=False, metrics=metrics)
+    with ShardedRankingSystem(shards_dir=collection / 'sharded_index', all_token=False, metrics=sharded_metrics) as sharded_ranking_system:
+        for query_tokens in QUERIES:
+            ranking_system.search(query_tokens)
+            sharded_ranking_system.search(query_tokens)
+
+    assert sharded_metrics.counters['filtered_documents'] == metrics.counters['filtered_documents']
+    for stage in ['filter', 'score', 'sort']:
+        assert sharded_metrics.timer_calls[stage] == NB_SHARDS * len(QUERIES)
+
+
+def test_sharded_without_shards_raises(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        ShardedRankingSystem(shards_dir=tmp_path)
+
+
+def test_sharded_with_broken_shard_raises_and_stops_workers(collection):
+    os.remove(collection / 'sharded_index' / 'shard_1' / 'documents.json')
+    with pytest.raises(RuntimeError, match='shard_1') as error:
+        ShardedRankingSystem(shards_dir=collection / 'sharded_index')
+    assert isinstance(error.value.__cause__, FileNotFoundError)
+    assert multiprocessing.active_children() == []
+
+
+def levenshtein(word_1, word_2):
+    previous_row = list(range(len(word_2) + 1))
+    for i, char_1 in enumerate(word_1, 1):
+        current_row = [i]
+        for j, char_2 in enumerate(word_2, 1):
+            current_row.append(min(previous_row[j] + 1, current_row[j - 1] + 1, previous_row[j - 1] + (char_1 != char_2)))
+        previous_row = current_row
+    return previous_row[-1]
+
+
+@pytest.mark.parametrize('max_edit_distance', [1, 2])
+def test_fuzzy_search_matches_brute_force(max_edit_distance):
+    rng = random.Random(0)
+    terms = {''.join(rng.choices('abcde', k=rng.randint(1, 6))) for _ in range(500)}
+    term_dictionary = TermDictionary(terms, max_edit_distance)
+    for _ in range(100):
+        word = ''.join(rng.choices('abcdef', k=rng.randint(0, 7)))
+        expected = sorted(((term, levenshtein(word, term)) for term in terms if levenshtein(word, term) <= max_edit_distance), 
+                          key=lambda x: (x[1], x[0]))
+        assert term_dictionary.fuzzy_search(word) == expected
+
+
+def test_autocomplete_completes_last_word_by_document_frequency(tmp_path):
+    documents = [{'id': 0, 'url': 'u0', 'title': 'rapide', 'content': 'requete'},
+                 {'id': 1, 'url': 'u1', 'title': 'requete', 'content': 'requetes'},
+                 {'id': 2, 'url': 'u2', 'title': 'rapide', 'content': 'requetes'},
+                 {'id': 3, 'url': 'u3', 'title': 'rapide', 'content': 'requetes'}]
+    write_json(tmp_path / 'documents.json', documents)
+    write_json(tmp_path / 'title.pos_index.json', build_positional_index(documents, 'title'))
+    write_json(tmp_path / 'content.pos_index.json', build_positional_index(documents, 'content'))
+    ranking_system = RankingSystem(index_title_file=tmp_path / 'title.pos_index.json',
+                                   index_content_file=tmp_path / 'content.pos_index.json',
+                                   documents_file=tmp_path / 'documents.json')
+
+    assert ranking_system.autocomplete('ma Req') == ['ma requetes', 'ma requete']
+    assert ranking_system.autocomplete('r', nb_suggestions=2) == ['rapide', 'requetes']
+    assert ranking_system.autocomplete('ma ') == []
+
+
+def test_top_completions_match_brute_force():
+    rng = random.Random(0)
+    terms = sorted({''.join(rng.choices('abc', k=rng.randint(1, 6))) for _ in range(300)})
+    frequencies = {term: rng.randint(0, 5) for term in terms}
+    term_dictionary = TermDictionary(terms, frequency=frequencies.get, nb_completions=5, completion_prefix_length=2)
+    for prefix in ['a', 'b', 'ab', 'cc', 'abc', 'bac', 'cab', 'abcab', 'd']:
+        for nb_terms in [3, 10]:
+            expected = sorted((term for term in terms if term.startswith(prefix)), key=lambda term: (-frequencies[term], term))
+            assert term_dictionary.top_completions(prefix, nb_terms) == expected[:nb_terms]
+
+
+def test_correct_query_tokens_skips_short_and_non_alphabetic_tokens(tmp_path):
+    documents = [{'id': 0, 'url': 'u0', 'title': 'chats', 'content': 'chiens a de'},
+                 {'id': 1, 'url': 'u1', 'title': 'chiens', 'content': 'chats chant'}]
+    write_json(tmp_path / 'documents.json', documents)
+    write_json(tmp_path / 'title.pos_index.json', build_positional_index(documents, 'title'))
+    write_json(tmp_path / 'content.pos_index.json', build_positional_index(documents, 'content'))
+    ranking_system = RankingSystem(index_title_file=tmp_path / 'title.pos_index.json',
+                                   index_content_file=tmp_path / 'content.pos_index.json',
+                                   documents_file=tmp_path / 'documents.json',
+                                   fuzzy=True)
+
+    # 'chat' est à distance 1 de 'chats' (2 titres et contenus) et de 'chant' (1) ; '?', 'b' et '42' ne sont pas corrigés
+    assert ranking_system.correct_query_tokens(['chat', '?', 'b', 'd', '42', 'chiens']) == ['chats', '?', 'b', 'd', '42', 'chiens']